@@ -7,3 +7,9 @@ ALPHAVANTAGE_KEY = os.getenv("ALPHAVANTAGE_API_KEY", "")
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "models")
 USE_PRETRAINED = True          # set False to force retraining
 CACHE_TTL_HOURS = 24            # retrain models every 24h
+STRATEGY_TIMEOUT_SECONDS = 10   # drop strategies that take longer than this
+DATA_CACHE_TTL_INTRADAY = 60    # seconds to reuse fetched intraday bars
+DATA_CACHE_TTL_DAILY = 3600     # seconds to reuse fetched 1d/1wk/1mo bars
+MODEL_CACHE_MAX_FILES = 2000    # newest strategy models kept in MODEL_DIR/cache (~10 per symbol×interval;
+                                # KNN/SVR pickles embed the training matrix), older/stale ones are deleted
+DATA_CACHE_MAXSIZE = 512        # (symbol, interval) indicator frames kept in memory
@@ -1,16 +1,17 @@
+import asyncio
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
-import pandas as pd
 import numpy as np
 
-from app.utils.data_fetcher import fetch_stock_data, clear_yfinance_cache
-from app.utils.indicators import add_technical_indicators
-from app.utils.ensemble import get_all_predictions, ensemble_prediction, cluster_predictions
-from app.utils.clustering import detect_regimes
+from app.utils.data_fetcher import fetch_stock_with_indicators, SUPPORTED_INTERVALS
+from app.utils.ensemble import get_all_predictions, ensemble_prediction, cluster_predictions, warm_pool, shutdown_pool
+from app.utils.clustering import detect_current_regime, load_regime_model
+from app.utils.strategies import prune_model_cache
 from app.utils.helpers import sanitize_float
 
-app = FastAPI(title="Advanced Stock Predictor AI")
+app = FastAPI(title="Advanced Stock Predictor AI", default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,10 +20,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rejects anything else with a 422 before it can reach a cache key or file name
+INTERVAL_PATTERN = "^(" + "|".join(SUPPORTED_INTERVALS) + ")$"
+
+# DataFrame column -> key in the /api/stock payload
+STOCK_PAYLOAD_COLUMNS = {
+    'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume',
+    'RSI': 'rsi', 'MACD': 'macd', 'MA_50': 'ma_50',
+}
+# float32 is plenty for chart values and serializes shorter; volume can exceed
+# float32's exact integer range, so it stays float64
+STOCK_PAYLOAD_DTYPES = {'volume': np.float64}
+
 @app.on_event("startup")
 async def startup_event():
-    clear_yfinance_cache()
-    # Optional: preload models here
+    await asyncio.to_thread(load_regime_model)
+    await asyncio.to_thread(prune_model_cache)
+    await asyncio.to_thread(warm_pool)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pool()
 
 @app.get("/")
 def root():
@@ -33,43 +51,41 @@ def health():
     return {"status": "ok", "time": datetime.now().isoformat()}
 
 @app.get("/api/stock/{symbol}")
-def get_stock_data(
+async def get_stock_data(
     symbol: str,
-    interval: str = Query("1d", description="5m,15m,1h,4h,1d,1wk,1mo")
+    interval: str = Query("1d", description=",".join(SUPPORTED_INTERVALS), pattern=INTERVAL_PATTERN)
 ):
     try:
-        df = fetch_stock_data(symbol, interval)
-        df = add_technical_indicators(df)
-        df_clean = df.replace([np.inf, -np.inf], np.nan)
-        df_clean = df_clean.where(pd.notnull(df_clean), None)
-        payload = {"symbol": symbol.upper(), "interval": interval, "data": []}
-        for index, row in df_clean.tail(500).iterrows():
-            payload["data"].append({
-                "date": index.isoformat(),
-                "open": sanitize_float(row['Open']),
-                "high": sanitize_float(row['High']),
-                "low": sanitize_float(row['Low']),
-                "close": sanitize_float(row['Close']),
-                "volume": sanitize_float(row['Volume']),
-                "rsi": sanitize_float(row.get('RSI')),
-                "macd": sanitize_float(row.get('MACD')),
-                "ma_50": sanitize_float(row.get('MA_50'))
-            })
-        return payload
+        df = await asyncio.to_thread(fetch_stock_with_indicators, symbol, interval)
+        tail = df.tail(500)
+        data = {"date": tail.index.strftime("%Y-%m-%dT%H:%M:%S")}
+        for column, key in STOCK_PAYLOAD_COLUMNS.items():
+            values = tail[column] if column in tail else np.full(len(tail), np.nan)
+            data[key] = np.asarray(values, dtype=STOCK_PAYLOAD_DTYPES.get(key, np.float32))
+        # Rows keep numpy scalars: orjson writes them natively and NaN/inf as null
+        payload = {
+            "symbol": symbol.upper(),
+            "interval": interval,
+            "data": [dict(zip(data, row)) for row in zip(*data.values())],
+        }
+        # Returned as a response so FastAPI's jsonable_encoder doesn't unwrap the numpy scalars
+        return ORJSONResponse(payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/predict/{symbol}")
-def predict_stock_price(
+async def predict_stock_price(
     symbol: str,
-    interval: str = Query("1d", description="5m,15m,1h,1d")
+    interval: str = Query("1d", description=",".join(SUPPORTED_INTERVALS), pattern=INTERVAL_PATTERN)
 ):
     try:
-        df = fetch_stock_data(symbol, interval)
-        df = add_technical_indicators(df)
+        df, _ = await asyncio.gather(
+            asyncio.to_thread(fetch_stock_with_indicators, symbol, interval),
+            asyncio.to_thread(load_regime_model),
+        )
 
         # 1. Get predictions from all strategies
-        raw_preds = get_all_predictions(df)
+        raw_preds = await asyncio.to_thread(get_all_predictions, df, symbol, interval)
         if not raw_preds:
             raise HTTPException(status_code=500, detail="No strategy could produce a prediction")
 
@@ -80,8 +96,7 @@ def predict_stock_price(
         final_pred = ensemble_prediction(clustered_preds, method='trimmed')
 
         # 4. Regime detection (for information)
-        regimes, kmeans, scaler = detect_regimes(df, n_clusters=3)
-        current_regime = int(regimes.iloc[-1]) if regimes is not None and not pd.isna(regimes.iloc[-1]) else None
+        current_regime = await asyncio.to_thread(detect_current_regime, df, 3)
 
         current_price = df['Close'].iloc[-1]
         direction = "UP" if final_pred > current_price else "DOWN"
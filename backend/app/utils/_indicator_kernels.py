@@ -0,0 +1,132 @@
+import numpy as np
+from app.utils._njit import njit
+
+# fastmath without 'nnan'/'ninf': the kernels below test for NaN explicitly
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _rolling_mean(x, n):
+    """Rolling mean over a window of n; NaN until the window is full or while it holds a NaN."""
+    size = x.shape[0]
+    out = np.full(size, np.nan)
+    s = 0.0
+    nans = 0
+    for i in range(size):
+        v = x[i]
+        if np.isnan(v):
+            nans += 1
+        else:
+            s += v
+        if i >= n:
+            old = x[i - n]
+            if np.isnan(old):
+                nans -= 1
+            else:
+                s -= old
+        if i >= n - 1 and nans == 0:
+            out[i] = s / n
+    return out
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _ema(x, span):
+    """Exponential moving average, matching pandas ewm(span=span, adjust=False).mean()."""
+    size = x.shape[0]
+    out = np.full(size, np.nan)
+    alpha = 2.0 / (span + 1.0)
+    weighted = np.nan
+    old_wt = 1.0
+    for i in range(size):
+        v = x[i]
+        if np.isnan(weighted):
+            if not np.isnan(v):
+                weighted = v
+        else:
+            old_wt *= 1.0 - alpha
+            if not np.isnan(v):
+                weighted = (old_wt * weighted + alpha * v) / (old_wt + alpha)
+                old_wt = 1.0
+        out[i] = weighted
+    return out
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _wilder_ema(x, n):
+    """Wilder's smoothing (alpha=1/n), seeded with the simple mean of the first n finite values.
+
+    NaNs are skipped: they neither count toward the seed nor move the average.
+    """
+    size = x.shape[0]
+    out = np.full(size, np.nan)
+    avg = 0.0
+    count = 0
+    for i in range(size):
+        v = x[i]
+        if count < n:
+            if not np.isnan(v):
+                avg += v
+                count += 1
+                if count == n:
+                    avg /= n
+                    out[i] = avg
+            continue
+        if not np.isnan(v):
+            avg += (v - avg) / n
+        out[i] = avg
+    return out
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _bbands(close, n=20):
+    """Rolling mean and sample std in one pass from running sum / sum of squares.
+
+    Values are shifted by the first finite value before accumulating so the
+    sum-of-squares difference does not lose precision at price scale.
+    """
+    size = close.shape[0]
+    mean = np.full(size, np.nan)
+    std = np.full(size, np.nan)
+    k = 0.0
+    for i in range(size):
+        if not np.isnan(close[i]):
+            k = close[i]
+            break
+    s = 0.0
+    s2 = 0.0
+    nans = 0
+    for i in range(size):
+        x = close[i] - k
+        if np.isnan(x):
+            nans += 1
+        else:
+            s += x
+            s2 += x * x
+        if i >= n:
+            x_out = close[i - n] - k
+            if np.isnan(x_out):
+                nans -= 1
+            else:
+                s -= x_out
+                s2 -= x_out * x_out
+        if i >= n - 1 and nans == 0:
+            m = s / n
+            var = (s2 - s * m) / (n - 1)
+            mean[i] = m + k
+            std[i] = np.sqrt(var) if var > 0 else 0.0
+    return mean, std
+
+@njit(cache=True)
+def _bfill_ffill_2d(vals):
+    """In place, per column: fill NaNs from the next valid value, trailing NaNs from the last one."""
+    rows, cols = vals.shape
+    for j in range(cols):
+        last = -1
+        nxt = np.nan
+        for i in range(rows - 1, -1, -1):
+            if np.isnan(vals[i, j]):
+                vals[i, j] = nxt
+            else:
+                if last < 0:
+                    last = i
+                nxt = vals[i, j]
+        if last >= 0:
+            for i in range(last + 1, rows):
+                vals[i, j] = vals[last, j]
+    return vals
@@ -1,10 +1,26 @@
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 from app.config import MODEL_DIR
+from app.utils.model_loader import load_model
+
+# Features used for clustering
+CLUSTER_FEATURES = ['RSI', 'MACD', 'Volatility', 'MA_50', 'Volume']
+
+_REGIME_MODEL = {}
+
+def load_regime_model():
+    """Load the (kmeans, scaler) pair once per process; (None, None) if not trained yet."""
+    if not _REGIME_MODEL:
+        kmeans = load_model("kmeans.pkl")
+        scaler = load_model("scaler.pkl")
+        if kmeans is None or scaler is None:
+            return None, None
+        _REGIME_MODEL.update(kmeans=kmeans, scaler=scaler)
+    return _REGIME_MODEL["kmeans"], _REGIME_MODEL["scaler"]
 
 def detect_regimes(df, n_clusters=3, retrain=False):
     """
@@ -14,9 +30,7 @@ def detect_regimes(df, n_clusters=3, retrain=False):
     cluster_path = os.path.join(MODEL_DIR, "kmeans.pkl")
     scaler_path = os.path.join(MODEL_DIR, "scaler.pkl")
 
-    # Features used for clustering
-    cluster_features = ['RSI', 'MACD', 'Volatility', 'MA_50', 'Volume']
-    df_cluster = df[cluster_features].dropna()
+    df_cluster = df[CLUSTER_FEATURES].dropna()
 
     if len(df_cluster) < 50:
         return None, None, None
@@ -24,13 +38,13 @@ def detect_regimes(df, n_clusters=3, retrain=False):
     if retrain or not os.path.exists(cluster_path):
         scaler = StandardScaler()
         scaled = scaler.fit_transform(df_cluster)
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=256, random_state=42)
         labels = kmeans.fit_predict(scaled)
         joblib.dump(kmeans, cluster_path)
         joblib.dump(scaler, scaler_path)
+        _REGIME_MODEL.update(kmeans=kmeans, scaler=scaler)
     else:
-        kmeans = joblib.load(cluster_path)
-        scaler = joblib.load(scaler_path)
+        kmeans, scaler = load_regime_model()
         scaled = scaler.transform(df_cluster)
         labels = kmeans.predict(scaled)
 
@@ -38,3 +52,22 @@ def detect_regimes(df, n_clusters=3, retrain=False):
     full_labels = pd.Series(index=df.index, dtype=float)
     full_labels.loc[df_cluster.index] = labels
     return full_labels, kmeans, scaler
+
+def detect_current_regime(df, n_clusters=3):
+    """
+    Regime label of the most recent row only, or None if it can't be determined.
+    Uses the saved model directly; trains one via detect_regimes if none exists yet.
+    """
+    if not os.path.exists(os.path.join(MODEL_DIR, "kmeans.pkl")):
+        labels, _, _ = detect_regimes(df, n_clusters)
+        if labels is None or pd.isna(labels.iloc[-1]):
+            return None
+        return int(labels.iloc[-1])
+
+    last = df[CLUSTER_FEATURES].iloc[[-1]].dropna()
+    if last.empty:
+        return None
+    kmeans, scaler = load_regime_model()
+    if kmeans is None:
+        return None
+    return int(kmeans.predict(scaler.transform(last))[0])
@@ -1,32 +1,61 @@
-import os
-import shutil
 import ssl
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
 import yfinance as yf
 from fastapi import HTTPException
+from app.config import DATA_CACHE_TTL_INTRADAY, DATA_CACHE_TTL_DAILY, DATA_CACHE_MAXSIZE
+from app.utils.indicators import add_technical_indicators
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
-def clear_yfinance_cache():
-    cache_dirs = [
-        os.path.join(os.path.expanduser("~"), ".cache", "py-yfinance"),
-        os.path.join(os.path.expanduser("~"), "AppData", "Local", "py-yfinance")
-    ]
-    for path in cache_dirs:
-        if os.path.exists(path):
-            try:
-                shutil.rmtree(path)
-            except Exception:
-                pass
+# API interval -> yfinance interval
+INTERVAL_MAP = {
+    "5m": "5m", "15m": "15m", "30m": "30m",
+    "1h": "60m", "4h": "60m",  # we'll resample later
+    "1d": "1d", "1wk": "1wk", "1mo": "1mo"
+}
+SUPPORTED_INTERVALS = tuple(INTERVAL_MAP)
+
+_cache = OrderedDict()   # key -> (stored_at, value), least recently used first
+_cache_lock = threading.Lock()
+
+def _cache_ttl(interval: str) -> float:
+    return DATA_CACHE_TTL_DAILY if interval in ("1d", "1wk", "1mo") else DATA_CACHE_TTL_INTRADAY
+
+def _cached(key, ttl, loader):
+    """Return the cached value for key if younger than ttl seconds, else call loader and store it."""
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < ttl:
+            _cache.move_to_end(key)
+            return hit[1]
+    value = loader()
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), value)
+        _cache.move_to_end(key)
+        while len(_cache) > DATA_CACHE_MAXSIZE:
+            _cache.popitem(last=False)
+    return value
 
 def fetch_stock_data(symbol: str, interval: str = "1d") -> pd.DataFrame:
+    """OHLCV history for symbol."""
+    return _download(symbol.upper(), interval)
+
+def fetch_stock_with_indicators(symbol: str, interval: str = "1d") -> pd.DataFrame:
+    """fetch_stock_data with add_technical_indicators applied, reused from memory for a short TTL.
+
+    Only this frame is cached: every endpoint reads it, so a separate raw OHLCV
+    entry would never be hit and would only take cache slots.
+    """
     symbol = symbol.upper()
-    interval_map = {
-        "5m": "5m", "15m": "15m", "30m": "30m",
-        "1h": "60m", "4h": "60m",  # we'll resample later
-        "1d": "1d", "1wk": "1wk", "1mo": "1mo"
-    }
-    yf_interval = interval_map.get(interval, "1d")
+    df = _cached((symbol, interval), _cache_ttl(interval),
+                 lambda: add_technical_indicators(_download(symbol, interval)))
+    return df.copy()
+
+def _download(symbol: str, interval: str) -> pd.DataFrame:
+    yf_interval = INTERVAL_MAP.get(interval, "1d")
     if yf_interval in ["5m","15m","30m"]:
         period = "59d"
     elif yf_interval == "60m":
@@ -1,39 +1,188 @@
+import os
+import math
+import pickle
+import signal
+import threading
+import multiprocessing
 import numpy as np
 from collections import defaultdict
-from app.utils.strategies import ALL_STRATEGIES
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from app.config import STRATEGY_TIMEOUT_SECONDS
+from app.utils.strategies import (ALL_STRATEGIES, IN_PROCESS_STRATEGIES, StrategyTimeout,
+                                  prepare_ml_data, prune_model_cache)
 
-def get_all_predictions(df):
-    """Run all strategies and return dict of {strategy_name: prediction}."""
-    predictions = {}
+_WORKERS = os.cpu_count() or 1
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool():
+    """Lazily create the shared strategy worker pool (None if processes are unavailable)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            try:
+                # spawn: forking a process that already runs threads (uvicorn, BLAS) can deadlock
+                _POOL = ProcessPoolExecutor(
+                    max_workers=_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            except (OSError, NotImplementedError, ImportError):
+                return None
+        return _POOL
+
+def _noop():
+    pass
+
+def warm_pool():
+    """Start every worker now, so the first request doesn't pay for spawning and the model imports."""
+    pool = _get_pool()
+    if pool is not None:
+        for future in [pool.submit(_noop) for _ in range(_WORKERS)]:
+            future.result()
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _reset_pool(pool):
+    """Discard a broken pool, unless a concurrent request has already replaced it."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not pool:
+            return
+        _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _on_timeout(signum, frame):
+    raise StrategyTimeout(f"strategy exceeded {STRATEGY_TIMEOUT_SECONDS}s")
+
+def _run_strategy(strategy, payload, symbol, interval):
+    """Worker entry point. The timeout runs from when the strategy starts, not from when it was queued,
+    and interrupts the strategy so a straggler doesn't keep holding the worker."""
+    df, prepared = pickle.loads(payload)
+    has_timer = hasattr(signal, "setitimer")  # not on Windows
+    if has_timer:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, STRATEGY_TIMEOUT_SECONDS)
+    try:
+        return strategy(df, prepared, symbol, interval)
+    finally:
+        if has_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+def _valid(pred):
+    return pred is not None and not np.isnan(pred)
+
+def get_all_predictions(df, symbol=None, interval=None):
+    """Run all strategies in parallel and return dict of {strategy_name: prediction}.
+
+    symbol/interval let ML strategies reuse models fitted for the same series.
+    """
+    prepared = prepare_ml_data(df)
+    pool = _get_pool()
+    remote = [] if pool is None else [s for s in ALL_STRATEGIES if s not in IN_PROCESS_STRATEGIES]
+
+    futures = {}
+    if remote:
+        payload = pickle.dumps((df, prepared), protocol=pickle.HIGHEST_PROTOCOL)
+        futures = {pool.submit(_run_strategy, strategy, payload, symbol, interval): strategy.__name__ for strategy in remote}
+
+    results = {}
     for strategy in ALL_STRATEGIES:
-        name = strategy.__name__
+        if strategy in remote:
+            continue
         try:
-            pred = strategy(df)
-            if pred is not None and not np.isnan(pred):
-                predictions[name] = pred
-        except Exception as e:
+            results[strategy.__name__] = strategy(df, prepared, symbol, interval)
+        except Exception:
             # silently skip failing strategies
             pass
+
+    if futures:
+        # Workers enforce the per-strategy timeout; this deadline only guards against a wedged worker
+        rounds = math.ceil(len(futures) / _WORKERS) + 1
+        done, not_done = wait(futures, timeout=STRATEGY_TIMEOUT_SECONDS * rounds)
+        for future in not_done:
+            future.cancel()
+        broken = False
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except BrokenProcessPool:
+                broken = True
+            except Exception:
+                # silently skip failing strategies
+                pass
+        if broken:
+            _reset_pool(pool)
+
+    predictions = {}
+    for strategy in ALL_STRATEGIES:
+        pred = results.get(strategy.__name__)
+        if _valid(pred):
+            predictions[strategy.__name__] = pred
+    prune_model_cache()
     return predictions
 
+def _cluster_1d(values, k=3):
+    """
+    Exact k-means for scalar values: in 1-D the optimal clusters are contiguous
+    runs of the sorted values, so pick the split points minimising within-cluster
+    squared error by dynamic programming over prefix sums.
+    Returns (labels in input order, centroids).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    order = np.argsort(values, kind="stable")
+    x = values[order]
+    n = len(x)
+    s = np.concatenate(([0.0], np.cumsum(x)))
+    s2 = np.concatenate(([0.0], np.cumsum(x * x)))
+
+    cost = np.full((k + 1, n + 1), np.inf)
+    cost[0, 0] = 0.0
+    split = np.zeros((k + 1, n + 1), dtype=int)
+    for c in range(1, k + 1):
+        for j in range(c, n + 1):
+            for i in range(c - 1, j):
+                # squared error of x[i:j] around its mean
+                sse = s2[j] - s2[i] - (s[j] - s[i]) ** 2 / (j - i)
+                if cost[c - 1, i] + sse < cost[c, j]:
+                    cost[c, j] = cost[c - 1, i] + sse
+                    split[c, j] = i
+
+    bounds = [n]
+    for c in range(k, 0, -1):
+        bounds.append(split[c, bounds[-1]])
+    bounds = bounds[::-1]
+    labels = np.empty(n, dtype=int)
+    labels[order] = np.repeat(np.arange(k), np.diff(bounds))
+    centroids = (s[bounds[1:]] - s[bounds[:-1]]) / np.diff(bounds)
+    return labels, centroids
+
 def cluster_predictions(pred_dict, n_clusters=3):
     """
     Optional: cluster the predictions themselves to reduce outlier influence.
-    Returns a dict with cluster assignments and the centroid of the largest cluster.
+    Returns the predictions in the largest cluster and the cluster model
+    (centroid array for the numpy path, fitted KMeans when n_clusters > 5).
     """
     if len(pred_dict) < n_clusters:
         return pred_dict, None
-    from sklearn.cluster import KMeans
-    import numpy as np
-    values = np.array(list(pred_dict.values())).reshape(-1,1)
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    labels = kmeans.fit_predict(values)
+    values = np.array(list(pred_dict.values()), dtype=np.float64)
+    if n_clusters > 5:
+        from sklearn.cluster import KMeans
+        model = KMeans(n_clusters=n_clusters, random_state=42)
+        labels = model.fit_predict(values.reshape(-1,1))
+    else:
+        labels, model = _cluster_1d(values, n_clusters)
     # find largest cluster
     unique, counts = np.unique(labels, return_counts=True)
     largest_cluster = unique[np.argmax(counts)]
     # return only predictions from largest cluster
     clustered = {name: pred for name, pred, lbl in zip(pred_dict.keys(), pred_dict.values(), labels) if lbl == largest_cluster}
-    return clustered, kmeans
+    return clustered, model
 
 def ensemble_prediction(predictions, method='mean'):
     """Combine predictions using mean, median, or trimmed mean."""
@@ -45,6 +194,12 @@ def ensemble_prediction(predictions, method='mean'):
     elif method == 'median':
         return float(np.median(vals))
     elif method == 'trimmed':
-        return float(np.mean(vals[np.abs(vals - np.mean(vals)) < 2*np.std(vals)]))
+        mean = vals.mean()
+        # With n values no point can sit more than sqrt(n-1) std away, so below 5 nothing is trimmed
+        if len(vals) < 5:
+            return float(mean)
+        dev = vals - mean
+        keep = vals[np.abs(dev) < 2*np.sqrt(np.mean(dev * dev))]
+        return float(keep.mean() if keep.size else mean)
     else:
         return float(np.mean(vals))
@@ -1,33 +1,45 @@
 import pandas as pd
 import numpy as np
+from app.utils._indicator_kernels import _rolling_mean, _bbands, _ema, _wilder_ema, _bfill_ffill_2d
 
 def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    # Moving averages
-    df['MA_10'] = df['Close'].rolling(10).mean()
-    df['MA_50'] = df['Close'].rolling(50).mean()
-    df['MA_200'] = df['Close'].rolling(200).mean()
+    close = df['Close'].to_numpy(dtype=np.float64)
 
-    # RSI
-    delta = df['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+    # RSI (Wilder)
+    delta = np.diff(close)
+    gain = np.maximum(delta, 0.0)
+    loss = -np.minimum(delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = _wilder_ema(gain, 14) / _wilder_ema(loss, 14)
+    rsi = np.empty_like(close)
+    rsi[0] = np.nan
+    rsi[1:] = 100 - (100 / (1 + rs))
 
     # MACD
-    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = exp1 - exp2
-    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    macd = _ema(close, 12) - _ema(close, 26)
 
     # Bollinger Bands
-    df['BB_upper'] = df['Close'].rolling(20).mean() + 2*df['Close'].rolling(20).std()
-    df['BB_lower'] = df['Close'].rolling(20).mean() - 2*df['Close'].rolling(20).std()
+    bb_mean, bb_std = _bbands(close, 20)
 
     # Volatility
-    df['Volatility'] = df['Close'].pct_change().rolling(20).std()
+    returns = np.empty_like(close)
+    returns[0] = np.nan
+    returns[1:] = close[1:] / close[:-1] - 1
+    _, volatility = _bbands(returns, 20)
 
-    # Fill NaNs
-    df = df.bfill().ffill()
+    df = df.assign(
+        MA_10=_rolling_mean(close, 10),
+        MA_50=_rolling_mean(close, 50),
+        MA_200=_rolling_mean(close, 200),
+        RSI=rsi,
+        MACD=macd,
+        Signal_Line=_ema(macd, 9),
+        BB_upper=bb_mean + 2*bb_std,
+        BB_lower=bb_mean - 2*bb_std,
+        Volatility=volatility,
+    )
+
+    # Fill NaNs (equivalent to bfill().ffill())
+    cols = df.columns[df.dtypes == np.float64]
+    df[cols] = _bfill_ffill_2d(df[cols].to_numpy(dtype=np.float64, copy=True))
     return df
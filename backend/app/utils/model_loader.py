@@ -1,13 +1,19 @@
 import os
+import time
 import joblib
 import pickle
 from app.config import MODEL_DIR
 
-def load_model(model_name: str):
-    """Load a scikit‑learn / xgboost model from .pkl file."""
+def load_model(model_name: str, max_age_hours=None):
+    """Load a scikit‑learn / xgboost model from .pkl file.
+
+    Returns None if the file is missing or, when max_age_hours is given, older than that.
+    """
     path = os.path.join(MODEL_DIR, model_name)
     if not os.path.exists(path):
         return None
+    if max_age_hours is not None and time.time() - os.path.getmtime(path) > max_age_hours * 3600:
+        return None
     try:
         return joblib.load(path)
     except:
@@ -17,6 +23,23 @@ def load_model(model_name: str):
         except:
             return None
 
+def prune_models(subdir: str, max_age_hours: float, max_files: int):
+    """Delete files in MODEL_DIR/subdir older than max_age_hours, then the oldest beyond max_files."""
+    directory = os.path.join(MODEL_DIR, subdir)
+    try:
+        entries = [e for e in os.scandir(directory) if e.is_file()]
+    except FileNotFoundError:
+        return
+    now = time.time()
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for i, entry in enumerate(entries):
+        if i >= max_files or now - entry.stat().st_mtime > max_age_hours * 3600:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass  # already removed by another worker, or read-only
+
 def save_model(model, model_name: str):
     path = os.path.join(MODEL_DIR, model_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     joblib.dump(model, path)
@@ -1,111 +1,216 @@
+import os
+import time
+import tempfile
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression, Ridge, Lasso
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.svm import SVR
 from sklearn.neighbors import KNeighborsRegressor
-from xgboost import XGBRegressor
+import xgboost as xgb
 from lightgbm import LGBMRegressor
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from app.config import MODEL_DIR, USE_PRETRAINED, CACHE_TTL_HOURS, MODEL_CACHE_MAX_FILES
+from app.utils.model_loader import load_model, save_model, prune_models
 import warnings
 warnings.filterwarnings("ignore")
 
+class StrategyTimeout(Exception):
+    """Raised inside a worker when a strategy overruns STRATEGY_TIMEOUT_SECONDS.
+
+    Deliberately not a TimeoutError: that is an OSError, which the model-cache
+    save paths swallow.
+    """
+
+# ---------------------- Model cache ----------------------
+def _cache_name(name, symbol, interval, ext="pkl"):
+    parts = (name, symbol, interval, ext)
+    if any(os.sep in p or (os.altsep and os.altsep in p) or ".." in p for p in parts):
+        raise ValueError(f"Invalid model cache name component in {parts!r}")
+    return os.path.join("cache", f"{name}_{symbol.upper()}_{interval}.{ext}")
+
+_last_prune = 0.0
+
+def prune_model_cache(min_interval_seconds=300):
+    """Bound MODEL_DIR/cache: drop entries past CACHE_TTL_HOURS, then the oldest beyond MODEL_CACHE_MAX_FILES.
+
+    Runs at most once per min_interval_seconds per process.
+    """
+    global _last_prune
+    if time.time() - _last_prune < min_interval_seconds:
+        return
+    _last_prune = time.time()
+    prune_models("cache", CACHE_TTL_HOURS, MODEL_CACHE_MAX_FILES)
+
+def _load_cached(name, symbol, interval):
+    """Saved entry for (name, symbol, interval), or None if reuse is off, missing or stale."""
+    if not USE_PRETRAINED or symbol is None:
+        return None
+    cached = load_model(_cache_name(name, symbol, interval), max_age_hours=CACHE_TTL_HOURS)
+    return cached if isinstance(cached, dict) else None
+
+def _save_cached(name, symbol, interval, entry):
+    if not USE_PRETRAINED or symbol is None:
+        return
+    try:
+        save_model(entry, _cache_name(name, symbol, interval))
+    except OSError:
+        pass
+
 # ---------------------- Statistical ----------------------
-def strategy_arima(df):
-    """ARIMA(5,1,0) on closing prices."""
+def strategy_arima(df, prepared, symbol=None, interval=None):
+    """ARIMA(5,1,0) on closing prices, warm-started from the last fit for this symbol."""
     series = df['Close'].values
     try:
         model = ARIMA(series, order=(5,1,0))
-        model_fit = model.fit()
+        last_bar = str(df.index[-1])
+        saved = _load_cached("arima", symbol, interval)
+        if saved is not None and saved.get("key") == last_bar:
+            # Same bar as the saved fit: keep its params and just run the filter
+            model_fit = model.filter(saved["params"])
+        elif saved is not None:
+            model_fit = model.fit(start_params=saved["params"], method_kwargs={"maxiter": 20})
+        else:
+            model_fit = model.fit()
+        if saved is None or saved.get("key") != last_bar:
+            _save_cached("arima", symbol, interval, {"key": last_bar, "params": model_fit.params})
         pred = model_fit.forecast(steps=1)[0]
         return float(pred)
     except:
         return np.nan
 
-def strategy_ets(df):
-    """Exponential smoothing (Holt‑Winters)."""
+# Free parameters of an additive-trend model, in statsmodels' start_params order
+_ETS_PARAMS = ('smoothing_level', 'smoothing_trend', 'initial_level', 'initial_trend')
+
+def strategy_ets(df, prepared, symbol=None, interval=None):
+    """Exponential smoothing (Holt‑Winters), reusing the last fit's parameters on the same bar
+    and warm-starting from them on a new one."""
     series = df['Close'].values
     try:
-        model = ExponentialSmoothing(series, trend='add', seasonal=None)
-        model_fit = model.fit()
+        last_bar = str(df.index[-1])
+        saved = _load_cached("ets", symbol, interval)
+        if saved is not None and saved.get("key") == last_bar:
+            params = saved["params"]
+            model = ExponentialSmoothing(series, trend='add', seasonal=None, initialization_method='known',
+                                         initial_level=params['initial_level'], initial_trend=params['initial_trend'])
+            model_fit = model.fit(smoothing_level=params['smoothing_level'],
+                                  smoothing_trend=params['smoothing_trend'], optimized=False)
+        else:
+            model = ExponentialSmoothing(series, trend='add', seasonal=None)
+            if saved is not None:
+                # Warm start from the previous bar's fit instead of the brute-force search
+                model_fit = model.fit(start_params=[saved["params"][k] for k in _ETS_PARAMS])
+            else:
+                model_fit = model.fit()
+            params = {k: model_fit.params[k] for k in _ETS_PARAMS}
+            _save_cached("ets", symbol, interval, {"key": last_bar, "params": params})
         pred = model_fit.forecast(1)[0]
         return float(pred)
     except:
         return np.nan
 
 # ---------------------- Machine Learning ----------------------
-def _prepare_ml_data(df):
-    """Shared feature/target preparation for ML models."""
-    df_ml = df.copy()
-    features = ['Open','High','Low','Volume','MA_10','MA_50','MA_200','RSI','MACD','Volatility']
-    df_ml['Target'] = df_ml['Close'].shift(-1)
-    train_data = df_ml.dropna()
-    if len(train_data) < 30:
+ML_FEATURES = ['Open','High','Low','Volume','MA_10','MA_50','MA_200','RSI','MACD','Volatility']
+
+def prepare_ml_data(df):
+    """
+    Shared feature/target preparation for ML models.
+    Built once per request and passed to every strategy as `prepared`.
+    The arrays are freshly allocated: fitted models (e.g. KNN) keep references to X.
+    """
+    target = df['Close'].shift(-1)
+    rows = np.flatnonzero(df.notna().all(axis=1).to_numpy() & target.notna().to_numpy())
+    if len(rows) < 30:
         return None, None, None
-    X = train_data[features].values
-    y = train_data['Target'].values
-    last_row = df_ml.iloc[[-1]][features].values
+    features = np.empty((len(df), len(ML_FEATURES)))
+    for j, column in enumerate(ML_FEATURES):
+        features[:, j] = df[column].to_numpy(dtype=np.float64)
+    X = features[rows]
+    y = target.to_numpy(dtype=np.float64)[rows]
+    last_row = features[-1:]
     return X, y, last_row
 
-def strategy_linear(df):
-    X, y, last = _prepare_ml_data(df)
-    if X is None: return np.nan
-    model = LinearRegression()
-    model.fit(X, y)
+def _fit_cached(name, fit, df, symbol, interval):
+    """Return fit(), reusing the model saved for (symbol, interval) while its key and age allow.
+
+    The key is the feature set plus the timestamp of the last row, so a model is refit
+    once a new bar arrives or after CACHE_TTL_HOURS.
+    """
+    key = (tuple(ML_FEATURES), str(df.index[-1]))
+    cached = _load_cached(name, symbol, interval)
+    if cached is not None and cached.get("key") == key:
+        return cached["model"]
+    model = fit()
+    _save_cached(name, symbol, interval, {"key": key, "model": model})
+    return model
+
+def _predict_last(model, last):
+    """Prediction for the prepared last row.
+
+    `last` is already a contiguous float64 (1, n_features) array, so for linear
+    models the answer is a single dot product and sklearn's predict-time
+    validation would cost more than the arithmetic.
+    """
+    if isinstance(model, (LinearRegression, Ridge, Lasso)):
+        return float(last[0] @ model.coef_ + model.intercept_)
     return float(model.predict(last)[0])
 
-def strategy_ridge(df):
-    X, y, last = _prepare_ml_data(df)
+# Tree models run single-threaded: parallelism comes from the strategy worker pool
+XGB_PARAMS = {'objective': 'reg:squarederror', 'eta': 0.15, 'nthread': 1}
+
+def strategy_linear(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = Ridge(alpha=1.0)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("linear", lambda: LinearRegression().fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
-def strategy_lasso(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_ridge(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = Lasso(alpha=0.01)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("ridge", lambda: Ridge(alpha=1.0).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
-def strategy_rf(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_lasso(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = RandomForestRegressor(n_estimators=50, max_depth=5)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("lasso", lambda: Lasso(alpha=0.01).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
-def strategy_xgb(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_rf(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = XGBRegressor(n_estimators=50, learning_rate=0.1)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("rf", lambda: RandomForestRegressor(n_estimators=30, max_depth=5, n_jobs=1).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
-def strategy_lgbm(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_xgb(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = LGBMRegressor(n_estimators=50, learning_rate=0.1, verbose=-1)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    booster = _fit_cached("xgb_booster", lambda: xgb.train(XGB_PARAMS, xgb.DMatrix(X, label=y), num_boost_round=30),
+                          df, symbol, interval)
+    return float(booster.inplace_predict(last)[0])
 
-def strategy_svr(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_lgbm(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = SVR(kernel='rbf', C=100)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("lgbm", lambda: LGBMRegressor(n_estimators=30, learning_rate=0.15, num_leaves=15, min_child_samples=20, n_jobs=1, verbose=-1).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
-def strategy_knn(df):
-    X, y, last = _prepare_ml_data(df)
+def strategy_svr(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
     if X is None: return np.nan
-    model = KNeighborsRegressor(n_neighbors=5)
-    model.fit(X, y)
-    return float(model.predict(last)[0])
+    model = _fit_cached("svr", lambda: SVR(kernel='rbf', C=100).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
+
+def strategy_knn(df, prepared, symbol=None, interval=None):
+    X, y, last = prepared
+    if X is None: return np.nan
+    model = _fit_cached("knn", lambda: KNeighborsRegressor(n_neighbors=5).fit(X, y), df, symbol, interval)
+    return _predict_last(model, last)
 
 # ---------------------- Technical ----------------------
-def strategy_ma_crossover(df):
+def strategy_ma_crossover(df, prepared, symbol=None, interval=None):
     """If MA_10 > MA_50 → up, else down. Use last change as magnitude."""
     last_close = df['Close'].iloc[-1]
     last_ma10 = df['MA_10'].iloc[-1]
@@ -113,10 +218,14 @@ def strategy_ma_crossover(df):
     if pd.isna(last_ma10) or pd.isna(last_ma50):
         return np.nan
     direction = 1 if last_ma10 > last_ma50 else -1
-    avg_change = df['Close'].pct_change().rolling(5).mean().iloc[-1]
+    # mean of the last 5 bar-to-bar returns
+    recent = df['Close'].to_numpy(dtype=np.float64)[-6:]
+    if len(recent) < 6:
+        return np.nan
+    avg_change = np.mean(recent[1:] / recent[:-1] - 1)
     return last_close * (1 + direction * abs(avg_change))
 
-def strategy_rsi_reversal(df):
+def strategy_rsi_reversal(df, prepared, symbol=None, interval=None):
     """If RSI < 30 → oversold, predict up; if RSI > 70 → overbought, predict down."""
     last_rsi = df['RSI'].iloc[-1]
     last_close = df['Close'].iloc[-1]
@@ -128,9 +237,9 @@ def strategy_rsi_reversal(df):
     elif last_rsi > 70:
         return last_close * (1 - avg_volatility)
     else:
-        return last_close * (1 + np.random.randn() * avg_volatility * 0.1)  # fallback
+        return last_close  # neutral zone: no signal, expect no change
 
-def strategy_bollinger(df):
+def strategy_bollinger(df, prepared, symbol=None, interval=None):
     """If close < lower band → bounce up; if close > upper band → pull down."""
     last_close = df['Close'].iloc[-1]
     last_lower = df['BB_lower'].iloc[-1]
@@ -143,7 +252,7 @@ def strategy_bollinger(df):
     elif last_close > last_upper:
         return last_close * (1 - avg_vol)
     else:
-        return last_close * (1 + np.random.randn() * avg_vol * 0.1)
+        return last_close  # inside the bands: no signal, expect no change
 
 # ---------------------- Deep Learning (if TF available) ----------------------
 try:
@@ -151,21 +260,81 @@ try:
     from tensorflow.keras.models import Sequential
     from tensorflow.keras.layers import LSTM, Dense, Dropout
     TF_AVAILABLE = True
+    try:
+        # strategies already run one per worker process; keep TF from adding its own pool
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # TF runtime already initialised
 except:
     TF_AVAILABLE = False
 
-def strategy_lstm(df):
-    if not TF_AVAILABLE:
-        return np.nan
-    X, y, last = _prepare_ml_data(df)
-    if X is None or len(X) < 30:
-        return np.nan
+_LSTM_MODELS = OrderedDict()   # (SYMBOL, interval) -> (file mtime, model, scaler, predict), least recently used first
+_LSTM_MODELS_MAXSIZE = 16      # each entry holds a Keras model and a traced tf.function
+
+def _lstm_predictor(model):
+    """Single-row forward pass traced once, instead of model.predict's per-call setup."""
+    signature = [tf.TensorSpec((1, 1, len(ML_FEATURES)), tf.float32)]
+    return tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+def _remember_lstm(key, entry):
+    _LSTM_MODELS[key] = entry
+    _LSTM_MODELS.move_to_end(key)
+    while len(_LSTM_MODELS) > _LSTM_MODELS_MAXSIZE:
+        _LSTM_MODELS.popitem(last=False)
+
+def _load_lstm(symbol, interval):
+    """(model, scaler, predict) from the saved LSTM for (symbol, interval) if fresh, else None."""
+    if not USE_PRETRAINED or symbol is None:
+        return None
+    key = (symbol.upper(), interval)
+    path = os.path.join(MODEL_DIR, _cache_name("lstm", symbol, interval, ext="keras"))
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    if mtime is None or time.time() - mtime > CACHE_TTL_HOURS * 3600:
+        _LSTM_MODELS.pop(key, None)
+        return None
+    entry = _LSTM_MODELS.get(key)
+    if entry is None or entry[0] != mtime:
+        saved = _load_cached("lstm_scaler", symbol, interval)
+        if saved is None:
+            return None
+        try:
+            model = tf.keras.models.load_model(path)
+        except StrategyTimeout:
+            raise
+        except Exception:
+            # Unreadable (e.g. truncated) file: drop it so the caller retrains instead of failing until it expires
+            _LSTM_MODELS.pop(key, None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        entry = (mtime, model, saved["scaler"], _lstm_predictor(model))
+    _remember_lstm(key, entry)
+    return entry[1:]
+
+def _save_lstm(model, path):
+    """Save to a temporary file beside path and rename it into place, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(suffix=".keras", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        model.save(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _train_lstm(X, y, symbol, interval):
     from sklearn.preprocessing import MinMaxScaler
-    scaler = MinMaxScaler()
-    X_scaled = scaler.fit_transform(X)
-    last_scaled = scaler.transform(last)
+    scaler = MinMaxScaler().fit(X)
+    X_scaled = scaler.transform(X)
     X_lstm = X_scaled.reshape((X_scaled.shape[0], 1, X_scaled.shape[1]))
-    last_lstm = last_scaled.reshape((1, 1, X_scaled.shape[1]))
 
     model = Sequential()
     model.add(LSTM(32, return_sequences=False, input_shape=(1, X_scaled.shape[1])))
@@ -173,11 +342,34 @@ def strategy_lstm(df):
     model.add(Dense(1))
     model.compile(optimizer='adam', loss='mse')
     model.fit(X_lstm, y, epochs=5, batch_size=8, verbose=0)
-    pred = model.predict(last_lstm, verbose=0)[0,0]
+    predict = _lstm_predictor(model)
+
+    if USE_PRETRAINED and symbol is not None:
+        path = os.path.join(MODEL_DIR, _cache_name("lstm", symbol, interval, ext="keras"))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _save_cached("lstm_scaler", symbol, interval, {"scaler": scaler})
+            _save_lstm(model, path)
+            _remember_lstm((symbol.upper(), interval), (os.path.getmtime(path), model, scaler, predict))
+        except OSError:
+            pass
+    return model, scaler, predict
+
+def strategy_lstm(df, prepared, symbol=None, interval=None):
+    """Small LSTM on the ML features; trained once per CACHE_TTL_HOURS and symbol, then predict-only."""
+    if not TF_AVAILABLE:
+        return np.nan
+    X, y, last = prepared
+    if X is None or len(X) < 30:
+        return np.nan
+    loaded = _load_lstm(symbol, interval)
+    model, scaler, predict = loaded if loaded is not None else _train_lstm(X, y, symbol, interval)
+    last_lstm = (last * scaler.scale_ + scaler.min_).reshape((1, 1, X.shape[1])).astype(np.float32)
+    pred = predict(tf.constant(last_lstm)).numpy()[0,0]
     return float(pred)
 
 # ---------------------- Ensemble Helpers ----------------------
-def strategy_mean_of_all(df):
+def strategy_mean_of_all(df, prepared, symbol=None, interval=None):
     """Average of all other strategies (excluding itself)."""
     # This will be called by the ensemble manager later
     pass
@@ -201,4 +393,7 @@ ALL_STRATEGIES = [
 if TF_AVAILABLE:
     ALL_STRATEGIES.append(strategy_lstm)
 
+# Rule-based strategies take microseconds: run them in the request process, not the worker pool
+IN_PROCESS_STRATEGIES = {strategy_ma_crossover, strategy_rsi_reversal, strategy_bollinger}
+
 # We have 14+ strategies, easily expandable to 20+ by adding more (Prophet, GARCH, etc.)
@@ -0,0 +1,44 @@
+import itertools
+import numpy as np
+import pytest
+from app.utils.ensemble import cluster_predictions, _cluster_1d
+
+
+def _sse(values, labels):
+    return sum(((values[labels == c] - values[labels == c].mean()) ** 2).sum() for c in np.unique(labels))
+
+
+def _brute_force_sse(values, k):
+    return min(
+        _sse(values, np.array(assign))
+        for assign in itertools.product(range(k), repeat=len(values))
+        if len(set(assign)) == k
+    )
+
+
+@pytest.mark.parametrize("k", [2, 3])
+@pytest.mark.parametrize("seed", range(30))
+def test_cluster_1d_is_optimal(seed, k):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.standard_normal(rng.integers(k, 8)) * 5, 1)  # rounding leaves some ties
+    labels, centroids = _cluster_1d(values, k)
+    assert _sse(values, labels) == pytest.approx(_brute_force_sse(values, k), abs=1e-9)
+    np.testing.assert_allclose(centroids, [values[labels == c].mean() for c in range(k)])
+
+
+def test_cluster_1d_labels_follow_input_order():
+    labels, centroids = _cluster_1d(np.array([50.0, 1.0, 100.0, 2.0, 51.0]), 3)
+    assert labels.tolist() == [1, 0, 2, 0, 1]
+    np.testing.assert_allclose(centroids, [1.5, 50.5, 100.0])
+
+
+def test_cluster_predictions_keeps_largest_cluster():
+    preds = {"a": 100.0, "b": 100.5, "c": 99.8, "d": 120.0, "e": 80.0, "f": 100.2}
+    clustered, centroids = cluster_predictions(preds)
+    assert clustered == {"a": 100.0, "b": 100.5, "c": 99.8, "f": 100.2}
+    assert len(centroids) == 3
+
+
+def test_cluster_predictions_too_few():
+    preds = {"a": 1.0, "b": 2.0}
+    assert cluster_predictions(preds) == (preds, None)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from app.utils.ensemble import ensemble_prediction
+
+
+def _reference_trimmed(vals):
+    vals = np.asarray(vals, dtype=float)
+    mean, std = vals.mean(), vals.std()
+    keep = vals[np.abs(vals - mean) < 2 * std]
+    return float(keep.mean() if keep.size else mean)
+
+
+def _preds(vals):
+    return {f"s{i}": v for i, v in enumerate(vals)}
+
+
+@pytest.mark.parametrize("n, expected", [(2, 5.0), (3, 10 / 3), (4, 2.5), (5, 0.0)])
+def test_trimmed_boundary(n, expected):
+    # one outlier among zeros sits sqrt(n-1) std away: below 2 for n < 5, exactly 2 at n = 5
+    assert ensemble_prediction(_preds([0] * (n - 1) + [10]), 'trimmed') == pytest.approx(expected)
+
+
+def test_trimmed_identical_values():
+    assert ensemble_prediction(_preds([3.5] * 7), 'trimmed') == 3.5
+
+
+@pytest.mark.parametrize("n", range(1, 9))
+def test_trimmed_matches_reference(n):
+    rng = np.random.default_rng(n)
+    for _ in range(200):
+        vals = rng.standard_normal(n) * rng.choice([1, 10, 100])
+        vals[rng.integers(n)] += rng.choice([0, 5, 50])
+        assert ensemble_prediction(_preds(vals), 'trimmed') == pytest.approx(_reference_trimmed(vals))
+
+
+def test_empty_predictions():
+    assert ensemble_prediction({}, 'trimmed') is None
+
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils._indicator_kernels import _rolling_mean, _ema, _wilder_ema, _bbands, _bfill_ffill_2d
+from app.utils.indicators import add_technical_indicators
+
+
+def _series(seed, n=300, nans=True):
+    rng = np.random.default_rng(seed)
+    x = 100 + np.cumsum(rng.standard_normal(n))
+    if nans:
+        x[:3] = np.nan
+        x[rng.integers(3, n, size=5)] = np.nan
+    return x
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n", [1, 10, 50])
+def test_rolling_mean_matches_pandas(seed, n):
+    x = _series(seed)
+    expected = pd.Series(x).rolling(n).mean().to_numpy()
+    np.testing.assert_allclose(_rolling_mean(x, n), expected, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("span", [9, 12, 26])
+def test_ema_matches_pandas(seed, span):
+    x = _series(seed)
+    expected = pd.Series(x).ewm(span=span, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(_ema(x, span), expected, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bbands_matches_pandas(seed):
+    x = _series(seed)
+    x[100:130] = 123.45  # flat stretch: variance cancels to ~0 and must not go negative (NaN std)
+    mean, std = _bbands(x, 20)
+    rolling = pd.Series(x).rolling(20)
+    np.testing.assert_allclose(mean, rolling.mean().to_numpy(), rtol=1e-12, equal_nan=True)
+    # both running-sum implementations leave ~1e-7 of noise in the flat stretch, hence the atol
+    np.testing.assert_allclose(std, rolling.std().to_numpy(), rtol=1e-6, atol=1e-6, equal_nan=True)
+    assert np.all((std[119:130] >= 0) & (std[119:130] < 1e-5))
+
+
+def test_bbands_small_values():
+    # returns-sized inputs, as used for Volatility
+    x = _series(0) / 1e4 - 0.01
+    _, std = _bbands(x, 20)
+    np.testing.assert_allclose(std, pd.Series(x).rolling(20).std().to_numpy(), rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bfill_ffill_matches_pandas(seed):
+    rng = np.random.default_rng(seed)
+    vals = rng.standard_normal((40, 4))
+    vals[rng.random(vals.shape) < 0.3] = np.nan
+    vals[:5, 0] = np.nan     # leading gap
+    vals[-5:, 1] = np.nan    # trailing gap
+    vals[:, 2] = np.nan      # all missing
+    expected = pd.DataFrame(vals).bfill().ffill().to_numpy()
+    np.testing.assert_array_equal(_bfill_ffill_2d(vals.copy()), expected)
+
+
+def _reference_wilder(x, n):
+    """pandas ewm(alpha=1/n, adjust=False) seeded with the SMA of the first n finite values."""
+    finite = np.flatnonzero(~np.isnan(x))
+    seeded = np.full_like(x, np.nan)
+    if len(finite) >= n:
+        start = finite[n - 1]
+        seeded[start] = x[finite[:n]].mean()
+        seeded[start + 1:] = x[start + 1:]
+    return pd.Series(seeded).ewm(alpha=1 / n, adjust=False, ignore_na=True).mean().to_numpy()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_wilder_ema_matches_pandas(seed):
+    gain = np.maximum(np.diff(_series(seed)), 0.0)  # NaN gaps, including inside the seed window
+    gain[7] = np.nan
+    np.testing.assert_allclose(_wilder_ema(gain, 14), _reference_wilder(gain, 14), rtol=1e-10, equal_nan=True)
+
+
+def test_wilder_ema_too_short():
+    x = np.array([1.0, np.nan, 2.0, 3.0])
+    assert np.isnan(_wilder_ema(x, 4)).all()
+
+
+def test_rsi_survives_nan_in_first_bars():
+    close = _series(0, nans=False)
+    close[5] = np.nan
+    idx = pd.date_range("2024-01-01", periods=len(close))
+    df = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1e6}, index=idx)
+    rsi = add_technical_indicators(df)['RSI'].to_numpy()
+    assert np.isfinite(rsi).all()
+    assert ((rsi >= 0) & (rsi <= 100)).all()
+
+
+def _pandas_indicators(df):
+    """The original pandas implementation, with RSI switched to Wilder smoothing."""
+    df = df.copy()
+    close = df['Close']
+    df['MA_10'] = close.rolling(10).mean()
+    df['MA_50'] = close.rolling(50).mean()
+    df['MA_200'] = close.rolling(200).mean()
+    delta = close.diff().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = _reference_wilder(np.maximum(delta, 0.0), 14) / _reference_wilder(-np.minimum(delta, 0.0), 14)
+    df['RSI'] = 100 - (100 / (1 + rs))
+    df['MACD'] = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['BB_upper'] = close.rolling(20).mean() + 2*close.rolling(20).std()
+    df['BB_lower'] = close.rolling(20).mean() - 2*close.rolling(20).std()
+    df['Volatility'] = close.pct_change().rolling(20).std()
+    floats = df.columns[df.dtypes == np.float64]
+    df[floats] = df[floats].bfill().ffill()
+    return df
+
+
+def test_add_technical_indicators_matches_pandas():
+    close = _series(1, n=260, nans=False)
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'Open': close + rng.standard_normal(len(close)) * 0.1,
+        'High': close + 1,
+        'Low': close - 1,
+        'Close': close,
+        'Volume': rng.integers(1e5, 1e6, len(close)).astype(np.float64),
+        'Trades': rng.integers(10, 100, len(close)),  # non-float column: not touched by the gap fill
+    }, index=pd.date_range("2024-01-01", periods=len(close)))
+
+    original = df.copy()
+    out = add_technical_indicators(df)
+    expected = _pandas_indicators(df)
+
+    assert list(out.columns) == list(df.columns) + [
+        'MA_10', 'MA_50', 'MA_200', 'RSI', 'MACD', 'Signal_Line', 'BB_upper', 'BB_lower', 'Volatility']
+    assert out['Trades'].dtype == df['Trades'].dtype
+    np.testing.assert_array_equal(out['Trades'], df['Trades'])
+    assert not out.drop(columns='Trades').isna().any().any()
+    pd.testing.assert_frame_equal(out, expected, rtol=1e-9)
+    pd.testing.assert_frame_equal(df, original)  # input frame left unchanged